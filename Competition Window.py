@@ -5,8 +5,10 @@ from tkinter import ttk, messagebox, simpledialog
 from PIL import Image, ImageTk
 import random
 
-DB_PATH = 'data/competition.db'
-IMAGE_DIR = 'images'
+from results_engine import ensure_scores_table
+
+# Same database and Photos table that AdminWindow maintains
+DB_PATH = 'competition.db'
 
 class CompetitionWindow:
     def __init__(self, root):
@@ -15,7 +17,9 @@ class CompetitionWindow:
         self.root.geometry("800x600")
 
         self.db_conn = sqlite3.connect(DB_PATH)
+        ensure_scores_table(self.db_conn)
         self.current_photo = None
+        self.judge_name = None
         self.photo_sequence = []
 
         self.create_widgets()
@@ -44,7 +48,7 @@ class CompetitionWindow:
 
     def load_categories(self):
         cur = self.db_conn.cursor()
-        cur.execute("SELECT name FROM categories")
+        cur.execute("SELECT DISTINCT category FROM Photos ORDER BY category")
         categories = [row[0] for row in cur.fetchall()]
         self.category_dropdown['values'] = categories
 
@@ -56,10 +60,10 @@ class CompetitionWindow:
 
         cur = self.db_conn.cursor()
         cur.execute("""
-            SELECT photos.id, photos.filename 
-            FROM photos 
-            JOIN categories ON photos.category_id = categories.id 
-            WHERE categories.name = ?
+            SELECT id, filepath
+            FROM Photos
+            WHERE category = ?
+            ORDER BY id ASC
         """, (category_name,))
         photos = cur.fetchall()
 
@@ -69,9 +73,13 @@ class CompetitionWindow:
 
         self.photo_sequence = sorted(photos, key=lambda x: x[0])  # Sort by ID for consistent numbering
         self.current_photo = random.choice(self.photo_sequence)
-        image_path = os.path.join(IMAGE_DIR, self.current_photo[1])
+        image_path = self.current_photo[1]
+        if not os.path.isfile(image_path):
+            messagebox.showerror("Error", f"Image file not found:\n{image_path}")
+            self.current_photo = None
+            return
         image = Image.open(image_path)
-        image = image.resize((500, 400), Image.ANTIALIAS)
+        image = image.resize((500, 400), Image.LANCZOS)
         photo = ImageTk.PhotoImage(image)
         self.image_label.configure(image=photo)
         self.image_label.image = photo
@@ -84,12 +92,18 @@ class CompetitionWindow:
         if not self.current_photo:
             messagebox.showwarning("No Photo", "No photo is currently shown.")
             return
+        if not self.judge_name:
+            judge = simpledialog.askstring("Judge Name", "Enter your judge name:")
+            if not judge or not judge.strip():
+                messagebox.showwarning("No Judge", "Scores must be recorded against a judge.")
+                return
+            self.judge_name = judge.strip()
         score = simpledialog.askinteger("Judge Score", "Enter score (0-10):", minvalue=0, maxvalue=10)
         if score is None:
             return
         with self.db_conn:
-            self.db_conn.execute("INSERT INTO scores (photo_id, score) VALUES (?, ?)",
-                                 (self.current_photo[0], score))
+            self.db_conn.execute("INSERT INTO scores (photo_id, judge, score) VALUES (?, ?, ?)",
+                                 (self.current_photo[0], self.judge_name, score))
         messagebox.showinfo("Score Submitted", f"Score of {score} saved.")
         self.image_label.config(image='')
         self.image_label.image = None
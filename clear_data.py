@@ -1,14 +1,15 @@
 import sqlite3
 
-DB_PATH = 'data/competition.db'
+DB_PATH = 'competition.db'
 
 def clear_competition_data():
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
         # Delete scores first to avoid foreign key issues
-        c.execute("DELETE FROM scores")
-        c.execute("DELETE FROM photos")
-        c.execute("DELETE FROM categories")
+        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='scores' COLLATE NOCASE")
+        if c.fetchone():
+            c.execute("DELETE FROM scores")
+        c.execute("DELETE FROM Photos")
         conn.commit()
         print("All competition data deleted.")
 
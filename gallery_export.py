@@ -0,0 +1,346 @@
+import os
+import html
+import sqlite3
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+
+from results_engine import compute_results, result_rows
+
+DB_PATH = 'competition.db'
+OUTPUT_DIR = 'results_gallery'
+
+THUMB_SIZE = 240
+WEB_SIZE = 1600
+SHEET_COLUMNS = 6
+TILE_PADDING = 10
+CAPTION_HEIGHT = 40
+HEADER_HEIGHT = 50
+BACKGROUND = (255, 255, 255)
+MISSING_TILE = (200, 200, 200)
+
+
+def load_category_photos(db, category):
+    """Return the photos in a category as dicts numbered like refresh_photo_list."""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT id, filepath, photo_name, photographer
+        FROM Photos
+        WHERE category = ?
+        ORDER BY id ASC
+    """, (category,))
+    return [
+        {"number": idx, "id": photo_id, "filepath": filepath, "photo_name": photo_name, "photographer": photographer}
+        for idx, (photo_id, filepath, photo_name, photographer) in enumerate(cursor.fetchall(), start=1)
+    ]
+
+
+def rendition_path(output_dir, kind, photo_id):
+    return os.path.join(output_dir, kind, f"{photo_id}.jpg")
+
+
+def make_renditions(src, targets):
+    """Write a JPEG of src for each (dst, max_dim) in targets.
+
+    The source is decoded once for all sizes, and an existing dst newer than
+    src is reused as-is. Returns a list parallel to targets holding dst, or
+    None where the source image is missing or unreadable; either case is
+    reported once per source.
+    """
+    if not os.path.isfile(src):
+        print(f"Warning: Image file not found: {src}")
+        return [None] * len(targets)
+    src_mtime = os.path.getmtime(src)
+    stale = [(dst, max_dim) for dst, max_dim in targets
+             if not (os.path.isfile(dst) and os.path.getmtime(dst) >= src_mtime)]
+    if not stale:
+        return [dst for dst, _ in targets]
+    # Write beside dst and rename, so an interrupted run never leaves a
+    # truncated JPEG that the mtime check above would trust next time
+    tmp_path = None
+    try:
+        with Image.open(src) as pil_img:
+            largest = max(max_dim for _, max_dim in stale)
+            pil_img.draft("RGB", (largest, largest))
+            pil_img = pil_img.convert("RGB")
+            # Largest first, so each size is shrunk from the one before
+            for dst, max_dim in sorted(stale, key=lambda target: -target[1]):
+                pil_img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                tmp_path = f"{dst}.{os.getpid()}.tmp"
+                pil_img.save(tmp_path, "JPEG", quality=85)
+                os.replace(tmp_path, dst)
+    except Exception as e:
+        print(f"Warning: Could not create renditions of {src}: {e}")
+        if tmp_path and os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        return [None if (dst, max_dim) in stale else dst for dst, max_dim in targets]
+    return [dst for dst, _ in targets]
+
+
+def prune_renditions(output_dir, photo_ids):
+    """Delete renditions whose photo is no longer in the Photos table."""
+    keep = {f"{photo_id}.jpg" for photo_id in photo_ids}
+    for kind in ("thumbs", "web"):
+        kind_dir = os.path.join(output_dir, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        for name in os.listdir(kind_dir):
+            if name.endswith(".jpg") and name not in keep:
+                os.remove(os.path.join(kind_dir, name))
+
+
+def _make_renditions_task(args):
+    return make_renditions(*args)
+
+
+def _fit_text(draw, text, font, width):
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "...", font=font) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _write_png_chunk(f, tag, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(tag + data)
+    f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+class StreamingPNGWriter:
+    """Writes an RGB PNG one horizontal band at a time.
+
+    Only the band being written is ever held in memory, so the full image
+    can be far larger than what PIL would comfortably allocate.
+    """
+
+    def __init__(self, path, width, height):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(6)
+        self.file = open(path, "wb")
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        _write_png_chunk(self.file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_band(self, band):
+        if band.mode != "RGB" or band.width != self.width:
+            raise ValueError("Band must be an RGB image as wide as the PNG")
+        stride = self.width * 3
+        raw = band.tobytes()
+        # Filter type 0 (None) before every scanline
+        scanlines = b"".join(b"\x00" + raw[row * stride:(row + 1) * stride] for row in range(band.height))
+        data = self.compressor.compress(scanlines)
+        if data:
+            _write_png_chunk(self.file, b"IDAT", data)
+        self.rows_written += band.height
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.file.close()
+            raise ValueError(f"Expected {self.height} rows, wrote {self.rows_written}")
+        _write_png_chunk(self.file, b"IDAT", self.compressor.flush())
+        _write_png_chunk(self.file, b"IEND", b"")
+        self.file.close()
+
+
+def _paste_thumbnail(band, thumb_path, x, y):
+    """Centre the thumbnail in its square cell; False if it cannot be drawn."""
+    if thumb_path is None:
+        return False
+    try:
+        with Image.open(thumb_path) as thumb:
+            band.paste(thumb, (x + (THUMB_SIZE - thumb.width) // 2, y + (THUMB_SIZE - thumb.height) // 2))
+    except Exception as e:
+        print(f"Warning: Could not draw thumbnail {thumb_path}: {e}")
+        return False
+    return True
+
+
+def render_contact_sheet(category, photos, thumb_paths, sheet_path, columns=SHEET_COLUMNS):
+    """Stream a grid of captioned thumbnails for one category to sheet_path.
+
+    photos and thumb_paths are parallel lists; a None or unreadable thumbnail
+    is drawn as a grey placeholder. Each row of tiles is rendered and written before the
+    next thumbnail is opened.
+    """
+    font = ImageFont.load_default()
+    tile_w = THUMB_SIZE + 2 * TILE_PADDING
+    tile_h = THUMB_SIZE + CAPTION_HEIGHT + 2 * TILE_PADDING
+    columns = max(1, min(columns, len(photos)))
+    rows = (len(photos) + columns - 1) // columns
+    sheet_w = columns * tile_w
+
+    # Only a finished sheet is renamed into place, so index.html never links a partial PNG
+    tmp_path = f"{sheet_path}.{os.getpid()}.tmp"
+    writer = StreamingPNGWriter(tmp_path, sheet_w, HEADER_HEIGHT + rows * tile_h)
+    try:
+        header = Image.new("RGB", (sheet_w, HEADER_HEIGHT), BACKGROUND)
+        ImageDraw.Draw(header).text(
+            (TILE_PADDING, HEADER_HEIGHT // 2), f"{category} ({len(photos)} photos)",
+            fill=(0, 0, 0), font=font, anchor="lm"
+        )
+        writer.write_band(header)
+
+        for row in range(rows):
+            band = Image.new("RGB", (sheet_w, tile_h), BACKGROUND)
+            draw = ImageDraw.Draw(band)
+            start = row * columns
+            for col, (photo, thumb_path) in enumerate(zip(photos[start:start + columns], thumb_paths[start:start + columns])):
+                x = col * tile_w + TILE_PADDING
+                y = TILE_PADDING
+                if not _paste_thumbnail(band, thumb_path, x, y):
+                    draw.rectangle((x, y, x + THUMB_SIZE - 1, y + THUMB_SIZE - 1), fill=MISSING_TILE)
+                caption_y = y + THUMB_SIZE + 4
+                title = _fit_text(draw, f"#{photo['number']}: {photo['photo_name']}", font, THUMB_SIZE)
+                byline = _fit_text(draw, photo["photographer"], font, THUMB_SIZE)
+                draw.text((x, caption_y), title, fill=(0, 0, 0), font=font)
+                draw.text((x, caption_y + CAPTION_HEIGHT // 2), byline, fill=(90, 90, 90), font=font)
+            writer.write_band(band)
+        writer.close()
+    except Exception:
+        writer.file.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, sheet_path)
+    return sheet_path
+
+
+def _render_contact_sheet_task(args):
+    return render_contact_sheet(*args)
+
+
+def _gallery_filename(category):
+    safe = "".join(ch if ch.isalnum() else "_" for ch in category)
+    return safe or "category"
+
+
+def _sheet_filenames(category_names):
+    """Map each category to a contact sheet filename no other category shares.
+
+    Categories that sanitize to the same name ("A/B" and "A_B") get their
+    index appended. Names are compared case-insensitively since the output
+    may land on a Windows or macOS filesystem.
+    """
+    names = {}
+    taken = set()
+    for idx, category in enumerate(category_names, start=1):
+        base = f"contact_sheet_{_gallery_filename(category)}"
+        name = base
+        suffix = idx
+        while name.lower() in taken:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        taken.add(name.lower())
+        names[category] = f"{name}.png"
+    return names
+
+
+def write_gallery_html(path, categories, results):
+    """Write the static results page linking web renditions and contact sheets.
+
+    categories maps category -> (photos, thumb_paths, web_paths, sheet_file),
+    with paths relative to the output directory.
+    """
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\"><title>Competition Results</title>",
+        "<style>",
+        "body { font-family: Helvetica, Arial, sans-serif; margin: 20px; }",
+        ".grid { display: flex; flex-wrap: wrap; gap: 16px; }",
+        ".photo { width: 260px; }",
+        ".photo img { max-width: 260px; max-height: 260px; display: block; }",
+        ".missing { width: 260px; height: 200px; background: #ccc; }",
+        "</style></head><body>",
+        "<h1>Competition Results</h1>",
+    ]
+    for category, (photos, thumb_paths, web_paths, sheet_file) in categories.items():
+        ranking = {}
+        if category in results:
+            ranking = {row["photo_id"]: row for row in result_rows(results[category]) if row["judges"] > 0}
+        order = sorted(
+            range(len(photos)),
+            key=lambda i: (ranking[photos[i]["id"]]["rank"] if photos[i]["id"] in ranking else len(photos) + 1,
+                           photos[i]["number"])
+        )
+        parts.append(f"<h2>{html.escape(category)}</h2>")
+        parts.append(f"<p><a href=\"{html.escape(sheet_file)}\">Contact sheet</a></p>")
+        parts.append("<div class=\"grid\">")
+        for i in order:
+            photo = photos[i]
+            if thumb_paths[i] and web_paths[i]:
+                image = (f"<a href=\"{html.escape(web_paths[i])}\">"
+                         f"<img src=\"{html.escape(thumb_paths[i])}\" alt=\"{html.escape(photo['photo_name'])}\" loading=\"lazy\"></a>")
+            else:
+                image = "<div class=\"missing\"></div>"
+            result = ranking.get(photo["id"])
+            standing = f"Rank {result['rank']} ({result['score']:.2f})" if result else "Not scored"
+            parts.append(
+                f"<div class=\"photo\">{image}"
+                f"<div><strong>#{photo['number']}: {html.escape(photo['photo_name'])}</strong></div>"
+                f"<div>{html.escape(photo['photographer'])}</div>"
+                f"<div>{standing}</div></div>"
+            )
+        parts.append("</div>")
+    parts.append("</body></html>")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def export_gallery(db, output_dir=OUTPUT_DIR, workers=None, method="zscore"):
+    """Build renditions, contact sheets and index.html for every category.
+
+    Renditions are created across a process pool and reused on later runs
+    while they are newer than their source image; those of deleted photos
+    are removed. Returns the index path.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT DISTINCT category FROM Photos ORDER BY category")
+    category_names = [row[0] for row in cursor.fetchall()]
+    category_photos = {category: load_category_photos(db, category) for category in category_names}
+    results = compute_results(db, method)
+    os.makedirs(output_dir, exist_ok=True)
+
+    sheet_files = _sheet_filenames(category_names)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = []
+        for photos in category_photos.values():
+            for photo in photos:
+                jobs.append((photo["filepath"], [
+                    (rendition_path(output_dir, "thumbs", photo["id"]), THUMB_SIZE),
+                    (rendition_path(output_dir, "web", photo["id"]), WEB_SIZE),
+                ]))
+        done = {}
+        for (_, targets), made in zip(jobs, pool.map(_make_renditions_task, jobs, chunksize=8)):
+            done.update(zip((dst for dst, _ in targets), made))
+
+        categories = {}
+        sheet_jobs = []
+        for category, photos in category_photos.items():
+            if not photos:
+                continue
+            thumbs = [done[rendition_path(output_dir, "thumbs", p["id"])] for p in photos]
+            webs = [done[rendition_path(output_dir, "web", p["id"])] for p in photos]
+            sheet_file = sheet_files[category]
+            sheet_jobs.append((category, photos, thumbs, os.path.join(output_dir, sheet_file)))
+            categories[category] = (
+                photos,
+                [os.path.relpath(t, output_dir).replace(os.sep, "/") if t else None for t in thumbs],
+                [os.path.relpath(w, output_dir).replace(os.sep, "/") if w else None for w in webs],
+                sheet_file,
+            )
+        list(pool.map(_render_contact_sheet_task, sheet_jobs))
+
+    index_path = os.path.join(output_dir, "index.html")
+    write_gallery_html(index_path, categories, results)
+    prune_renditions(output_dir, [p["id"] for photos in category_photos.values() for p in photos])
+    return index_path
+
+
+if __name__ == '__main__':
+    with sqlite3.connect(DB_PATH) as conn:
+        print(f"Gallery written to {export_gallery(conn)}")
@@ -0,0 +1,419 @@
+import sqlite3
+import warnings
+import numpy as np
+
+DB_PATH = 'competition.db'
+
+# Fraction of judges dropped from each end before averaging a photo's scores
+TRIM_FRACTION = 0.1
+# Two-sided 95% Student-t quantiles t(0.975, df) for df = 1..30; larger df
+# use the Cornish-Fisher expansion in t_quantile_975
+T_975 = np.array([
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+])
+Z_975 = 1.959964
+
+
+def ensure_scores_table(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='scores' COLLATE NOCASE")
+    exists = cursor.fetchone()
+    if not exists:
+        cursor.execute("""
+            CREATE TABLE scores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                photo_id INTEGER NOT NULL,
+                judge TEXT NOT NULL DEFAULT '',
+                score INTEGER NOT NULL
+            )
+        """)
+        db.commit()
+    else:
+        cursor.execute("PRAGMA table_info(scores)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if "judge" not in columns:
+            cursor.execute("ALTER TABLE scores ADD COLUMN judge TEXT NOT NULL DEFAULT ''")
+            db.commit()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scores_photo_id ON scores (photo_id)")
+    # Covers the per-judge reads in load_score_matrices without touching the table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scores_judge ON scores (judge, photo_id, score)")
+    db.commit()
+
+
+def build_score_matrix(n_photos, photo_idx, judges, judge_idx, values):
+    """Scatter score rows into a (photos, judges) array, NaN where unscored.
+
+    Rows must be in the order they were recorded. A named judge re-scoring a
+    photo replaces their earlier score. Rows with no judge ('') cannot be
+    told apart, so they are averaged into a single column instead.
+    """
+    n_judges = len(judges)
+    scores = np.full((n_photos, n_judges), np.nan)
+    if len(values) == 0:
+        return scores
+
+    # Keep the last row for each (photo, judge) cell
+    cells = photo_idx * n_judges + judge_idx
+    _, first_from_end = np.unique(cells[::-1], return_index=True)
+    latest = len(cells) - 1 - first_from_end
+    scores[photo_idx[latest], judge_idx[latest]] = values[latest]
+
+    unattributed = [i for i, judge in enumerate(judges) if judge == '']
+    if unattributed:
+        rows = judge_idx == unattributed[0]
+        totals = np.bincount(photo_idx[rows], weights=values[rows], minlength=n_photos)
+        counts = np.bincount(photo_idx[rows], minlength=n_photos)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores[:, unattributed[0]] = np.where(counts > 0, totals / counts, np.nan)
+    return scores
+
+
+# Offsets that make every in-range photo_id / score print as exactly this
+# many digits, so _load_judge_scores can slice the packed strings apart
+# instead of parsing them
+ID_OFFSET, ID_DIGITS = 10 ** 8, 9
+SCORE_OFFSET, SCORE_DIGITS = 100, 3
+
+
+def _unpack_fixed_width(packed, digits, offset):
+    """Decode comma-separated fixed-width integers, or None if any token isn't.
+
+    A token is accepted only if it is exactly `digits` decimal digits, which
+    holds for integers in [0, 9 * offset) once offset has been added. A
+    negative, too large or REAL value shifts the commas or adds a '-', '.'
+    or 'e', and sends the caller to the slow path.
+    """
+    raw = np.frombuffer((packed + ",").encode("ascii"), dtype=np.uint8)
+    if len(raw) % (digits + 1):
+        return None
+    codes = raw.reshape(-1, digits + 1)
+    values = codes[:, :digits] - np.uint8(ord("0"))  # non-digits wrap past 9
+    if np.any(codes[:, digits] != ord(",")) or np.any(values > 9):
+        return None
+    place = 10 ** np.arange(digits - 1, -1, -1, dtype=np.int64)
+    return values.astype(np.int64) @ place - offset
+
+
+def _load_judge_scores(cursor, judge, judge_column="judge"):
+    """Return (photo_ids, values) arrays for every score recorded by judge.
+
+    SQLite packs the rows into one string so a million scores cost a single
+    fetch rather than a million Python tuples. Integer ids and scores in
+    range are packed at a fixed width and sliced apart; anything else (a
+    legacy REAL score, say) is parsed as text. group_concat does not promise
+    row order, so a named judge who re-scored a photo is re-read ORDER BY id
+    for build_score_matrix to keep their latest score.
+    """
+    # group_concat skips NULLs, which would misalign the two strings; legacy
+    # scores tables have no NOT NULL constraints
+    where = f"{judge_column} = ? AND photo_id IS NOT NULL AND score IS NOT NULL"
+    cursor.execute(f"""
+        SELECT group_concat({ID_OFFSET} + photo_id, ','), group_concat({SCORE_OFFSET} + score, ',')
+        FROM scores
+        WHERE {where}
+    """, (judge,))
+    packed_ids, packed_scores = cursor.fetchone()
+    if not packed_ids:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    photo_ids = _unpack_fixed_width(packed_ids, ID_DIGITS, ID_OFFSET)
+    values = _unpack_fixed_width(packed_scores, SCORE_DIGITS, SCORE_OFFSET)
+    if photo_ids is None or values is None:
+        cursor.execute(f"SELECT group_concat(photo_id, ' '), group_concat(score, ' ') FROM scores WHERE {where}", (judge,))
+        packed_ids, packed_scores = cursor.fetchone()
+        photo_ids = np.fromstring(packed_ids, dtype=np.int64, sep=" ")
+        values = np.fromstring(packed_scores, sep=" ")
+    values = values.astype(float)
+
+    if judge == '' or np.all(photo_ids[1:] > photo_ids[:-1]):
+        # Read through idx_scores_judge the ids arrive sorted, proving no re-scores
+        return photo_ids, values
+    ordered = np.sort(photo_ids)
+    if np.any(ordered[1:] == ordered[:-1]):
+        cursor.execute(f"SELECT photo_id, score FROM scores WHERE {where} ORDER BY id ASC", (judge,))
+        rows = np.array(cursor.fetchall(), dtype=float)
+        photo_ids, values = rows[:, 0].astype(np.int64), rows[:, 1]
+    return photo_ids, values
+
+
+def load_score_matrices(db):
+    """Return {category: (photo_ids, judges, scores)} for every category.
+
+    scores is a float array of shape (photos, judges) with NaN where a judge
+    did not score a photo. Photos are ordered by id, matching the #n
+    numbering in the admin window; unscored photos get an all-NaN row. All
+    scores are read once and split by category in NumPy.
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT category, group_concat(id, ' ') FROM Photos GROUP BY category ORDER BY category")
+    category_rows = cursor.fetchall()
+    if not category_rows:
+        return {}
+    categories = [category for category, _ in category_rows]
+    category_ids = [np.fromstring(packed, dtype=np.int64, sep=" ") for _, packed in category_rows]
+    all_ids = np.concatenate(category_ids)
+    photo_category = np.repeat(np.arange(len(categories)), [len(ids) for ids in category_ids])
+    by_id = np.argsort(all_ids, kind="stable")
+    all_ids = all_ids[by_id]
+    photo_category = photo_category[by_id]
+
+    # Read-only: a database the judging window has not upgraded yet may have
+    # no scores table, or scores without a judge column (all unattributed)
+    cursor.execute("PRAGMA table_info(scores)")
+    score_columns = [row[1] for row in cursor.fetchall()]
+    judge_column = "judge" if "judge" in score_columns else "''"
+    judges = []
+    if score_columns:
+        # Hop along idx_scores_judge one judge at a time instead of scanning every row
+        cursor.execute(f"""
+            WITH RECURSIVE judges(judge) AS (
+                SELECT min({judge_column}) FROM scores
+                UNION ALL
+                SELECT (SELECT min({judge_column}) FROM scores WHERE {judge_column} > judges.judge)
+                FROM judges
+                WHERE judges.judge IS NOT NULL
+            )
+            SELECT judge FROM judges WHERE judge IS NOT NULL
+        """)
+        judges = [row[0] for row in cursor.fetchall()]
+    photo_parts, judge_parts, value_parts = [], [], []
+    for judge_number, judge in enumerate(judges):
+        score_photo_ids, values = _load_judge_scores(cursor, judge, judge_column)
+        photo_parts.append(score_photo_ids)
+        judge_parts.append(np.full(len(values), judge_number, dtype=np.int64))
+        value_parts.append(values)
+
+    if judges:
+        score_photo_ids = np.concatenate(photo_parts)
+        judge_idx = np.concatenate(judge_parts)
+        values = np.concatenate(value_parts)
+    else:
+        score_photo_ids = judge_idx = np.empty(0, dtype=np.int64)
+        values = np.empty(0)
+
+    # Drop scores left behind by photos that have since been removed
+    photo_idx = np.minimum(np.searchsorted(all_ids, score_photo_ids), len(all_ids) - 1)
+    known = all_ids[photo_idx] == score_photo_ids
+    scores = build_score_matrix(len(all_ids), photo_idx[known], judges, judge_idx[known], values[known])
+
+    matrices = {}
+    for category_number, category in enumerate(categories):
+        rows = np.flatnonzero(photo_category == category_number)
+        category_scores = scores[rows]
+        used = np.flatnonzero(~np.all(np.isnan(category_scores), axis=0))
+        matrices[category] = (all_ids[rows], [judges[i] for i in used], category_scores[:, used])
+    return matrices
+
+
+def zscore_normalize(scores):
+    """Standardise each judge's column to mean 0 and standard deviation 1.
+
+    A judge who gave every photo the same score carries no ranking
+    information, so their column becomes 0 rather than dividing by zero.
+    """
+    # Judges with no scores in this category give all-NaN columns
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(scores, axis=0)
+        std = np.nanstd(scores, axis=0)
+    std = np.where(np.isnan(std) | (std == 0), 1.0, std)
+    return (scores - mean) / std
+
+
+def rank_normalize(scores):
+    """Replace each judge's scores with percentile ranks in [0, 1].
+
+    Ties share the average of their ranks and missing scores stay NaN. A
+    judge who scored a single photo puts it at 0.5.
+    """
+    n_photos, n_judges = scores.shape
+    if n_photos == 0 or n_judges == 0:
+        return scores.astype(float, copy=True)
+
+    order = np.argsort(scores, axis=0, kind="stable")  # NaN sorts last
+    ordered = np.take_along_axis(scores, order, axis=0)
+    positions = np.broadcast_to(np.arange(n_photos)[:, None], scores.shape)
+
+    # Tie groups are runs of equal values down each sorted column
+    new_group = np.ones(scores.shape, dtype=bool)
+    new_group[1:] = ordered[1:] != ordered[:-1]
+    ends_group = np.ones(scores.shape, dtype=bool)
+    ends_group[:-1] = new_group[1:]
+
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0), axis=0)
+    group_end = np.minimum.accumulate(np.where(ends_group, positions, n_photos)[::-1], axis=0)[::-1]
+    average_rank = (group_start + group_end) / 2.0
+
+    counts = np.sum(~np.isnan(scores), axis=0)
+    denominator = np.where(counts > 1, counts - 1, 1)
+    percentile = np.where(counts > 1, average_rank / denominator, 0.5)
+
+    ranks = np.empty(scores.shape)
+    np.put_along_axis(ranks, order, percentile, axis=0)
+    ranks[np.isnan(scores)] = np.nan
+    return ranks
+
+
+def _trim_window(scores, trim):
+    """Sort each photo's scores and mark the ones a trimmed mean keeps.
+
+    Returns (ordered, counts, cut, keep): scores sorted along each row with
+    NaN last, the number of judges per photo, how many are dropped from each
+    end, and a boolean mask over ordered of the scores that survive.
+    """
+    n_judges = scores.shape[1]
+    ordered = np.sort(scores, axis=1)  # NaN sorts last
+    counts = np.sum(~np.isnan(scores), axis=1)
+    cut = np.floor(trim * counts).astype(np.int64)
+    columns = np.arange(n_judges)[None, :]
+    keep = (columns >= cut[:, None]) & (columns < (counts - cut)[:, None])
+    return ordered, counts, cut, keep
+
+
+def trimmed_mean(scores, trim=TRIM_FRACTION):
+    """Mean of each photo's scores after dropping floor(trim * n) from each end.
+
+    n is the number of judges who scored that photo, so photos missing a few
+    scores are trimmed proportionally. Photos with no scores give NaN.
+    """
+    ordered, counts, cut, keep = _trim_window(scores, trim)
+    return _mean_of_kept(ordered, keep)
+
+
+def _mean_of_kept(ordered, keep):
+    kept = keep.sum(axis=1)
+    total = np.where(keep, ordered, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(kept > 0, total / kept, np.nan)
+
+
+def t_quantile_975(df):
+    """Two-sided 95% Student-t quantile for each entry of df (NaN below 1)."""
+    df = np.asarray(df, dtype=float)
+    z = Z_975
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expansion = z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+    table = T_975[np.clip(df, 1, len(T_975)).astype(np.int64) - 1]
+    return np.where(df < 1, np.nan, np.where(df <= len(T_975), table, expansion))
+
+
+def confidence_interval(scores, trim=TRIM_FRACTION):
+    """Return 95% (low, high) bounds around each photo's trimmed mean.
+
+    Uses the Tukey-McLaughlin standard error s_w * sqrt(n) / h, where s_w is
+    the standard deviation of the winsorized scores and h the number kept
+    after trimming, with a Student-t quantile on h - 1 degrees of freedom;
+    with trim=0 this is the usual t * s / sqrt(n). Photos with fewer than two
+    scores left after trimming get NaN bounds.
+    """
+    ordered, counts, cut, keep = _trim_window(scores, trim)
+    kept = keep.sum(axis=1)
+
+    # Winsorize: pull each trimmed score in to the nearest one that was kept
+    if scores.shape[1]:
+        rows = np.arange(scores.shape[0])
+        lowest = ordered[rows, np.minimum(cut, scores.shape[1] - 1)]
+        highest = ordered[rows, np.maximum(counts - cut - 1, 0)]
+        winsorized = np.clip(ordered, lowest[:, None], highest[:, None])
+    else:
+        winsorized = ordered
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        center = _mean_of_kept(ordered, keep)
+        std = np.nanstd(winsorized, axis=1, ddof=1)
+        margin = np.where(kept > 1, t_quantile_975(kept - 1) * std * np.sqrt(counts) / np.maximum(kept, 1), np.nan)
+    return center - margin, center + margin
+
+
+def rank_photos(photo_ids, final_scores):
+    """Return competition ranks (1, 2, 2, 4, ...) for final_scores.
+
+    Higher scores rank first; unscored photos come last and share a rank.
+    Returns (order, ranks) where order sorts the photos into ranking order.
+    """
+    sort_key = np.where(np.isnan(final_scores), -np.inf, final_scores)
+    order = np.lexsort((photo_ids, -sort_key))
+    ordered = sort_key[order]
+    positions = np.arange(1, len(order) + 1)
+    new_rank = np.ones(len(order), dtype=bool)
+    new_rank[1:] = ordered[1:] != ordered[:-1]
+    ranks = np.maximum.accumulate(np.where(new_rank, positions, 0))
+    return order, ranks
+
+
+def compute_category_results(photo_ids, scores, method="zscore", trim=TRIM_FRACTION):
+    """Normalise, aggregate and rank one category's photo x judge matrix.
+
+    method is "zscore", "rank" or "raw". Returns a dict of equal-length
+    NumPy columns in ranking order: rank, number, photo_id, score, ci_low,
+    ci_high and judges. Columns rather than one dict per photo keep a 100k
+    photo category from spending its time building Python objects.
+    """
+    if method == "zscore":
+        normalized = zscore_normalize(scores)
+    elif method == "rank":
+        normalized = rank_normalize(scores)
+    elif method == "raw":
+        normalized = scores.astype(float, copy=True)
+    else:
+        raise ValueError(f"Unknown normalisation method: {method}")
+
+    final = trimmed_mean(normalized, trim)
+    low, high = confidence_interval(normalized, trim)
+    judge_counts = np.sum(~np.isnan(scores), axis=1)
+    order, ranks = rank_photos(photo_ids, final)
+
+    # #n numbering follows refresh_photo_list: position in id order, from 1
+    return {
+        "rank": ranks,
+        "number": order + 1,
+        "photo_id": photo_ids[order],
+        "score": final[order],
+        "ci_low": low[order],
+        "ci_high": high[order],
+        "judges": judge_counts[order],
+    }
+
+
+def result_rows(results):
+    """Yield one dict per photo, in ranking order, from compute_category_results."""
+    columns = {name: column.tolist() for name, column in results.items()}
+    for values in zip(*columns.values()):
+        yield dict(zip(columns, values))
+
+
+def compute_results(db, method="zscore", trim=TRIM_FRACTION):
+    """Return {category: compute_category_results(...)} for every category in Photos.
+
+    Only reads the database; ensure_scores_table belongs to the scoring side.
+    """
+    return {
+        category: compute_category_results(photo_ids, scores, method, trim)
+        for category, (photo_ids, judges, scores) in load_score_matrices(db).items()
+    }
+
+
+def print_results(db, method="zscore"):
+    cursor = db.cursor()
+    cursor.execute("SELECT id, photo_name, photographer FROM Photos")
+    captions = {photo_id: (photo_name, photographer) for photo_id, photo_name, photographer in cursor.fetchall()}
+    for category, results in compute_results(db, method).items():
+        print(f"=== {category} ===")
+        for row in result_rows(results):
+            photo_name, photographer = captions[row["photo_id"]]
+            if row["judges"] == 0:
+                print(f"{row['rank']:>4}. #{row['number']}: {photo_name} by {photographer} - Not scored")
+                continue
+            print(
+                f"{row['rank']:>4}. #{row['number']}: {photo_name} by {photographer} - "
+                f"{row['score']:.3f} [{row['ci_low']:.3f}, {row['ci_high']:.3f}] "
+                f"({row['judges']} judges)"
+            )
+
+
+if __name__ == '__main__':
+    with sqlite3.connect(DB_PATH) as conn:
+        print_results(conn)
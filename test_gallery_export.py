@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import gallery_export
+
+
+def make_photo(path, size=(640, 480), color=(200, 40, 40)):
+    Image.new("RGB", size, color).save(path)
+    return str(path)
+
+
+def photo(number, photo_id, name="Photo", photographer="Ann"):
+    return {"number": number, "id": photo_id, "filepath": "", "photo_name": name, "photographer": photographer}
+
+
+def test_streaming_png_writer_output_reopens_in_pil(tmp_path):
+    path = tmp_path / "bands.png"
+    writer = gallery_export.StreamingPNGWriter(path, 30, 20)
+    writer.write_band(Image.new("RGB", (30, 12), (255, 0, 0)))
+    writer.write_band(Image.new("RGB", (30, 8), (0, 0, 255)))
+    writer.close()
+
+    with Image.open(path) as png:
+        assert png.size == (30, 20)
+        assert png.getpixel((5, 5)) == (255, 0, 0)
+        assert png.getpixel((5, 15)) == (0, 0, 255)
+
+
+def test_streaming_png_writer_close_rejects_wrong_row_count(tmp_path):
+    writer = gallery_export.StreamingPNGWriter(tmp_path / "short.png", 30, 20)
+    writer.write_band(Image.new("RGB", (30, 12)))
+    with pytest.raises(ValueError):
+        writer.close()
+    writer = gallery_export.StreamingPNGWriter(tmp_path / "narrow.png", 30, 20)
+    with pytest.raises(ValueError):
+        writer.write_band(Image.new("RGB", (10, 20)))
+    writer.file.close()
+
+
+def test_make_renditions_reuses_fresh_and_rebuilds_stale(tmp_path):
+    src = make_photo(tmp_path / "src.jpg", size=(2000, 1000))
+    thumb = str(tmp_path / "thumbs" / "1.jpg")
+    web = str(tmp_path / "web" / "1.jpg")
+    targets = [(thumb, 240), (web, 1600)]
+    assert gallery_export.make_renditions(src, targets) == [thumb, web]
+    with Image.open(thumb) as small, Image.open(web) as large:
+        assert small.size == (240, 120)
+        assert large.size == (1600, 800)
+
+    # Fresh: both renditions newer than the source are left untouched
+    os.utime(src, (1000, 1000))
+    os.utime(thumb, (2000, 2000))
+    os.utime(web, (2000, 2000))
+    gallery_export.make_renditions(src, targets)
+    assert os.path.getmtime(thumb) == os.path.getmtime(web) == 2000
+
+    # Stale: only the rendition older than the source is rebuilt
+    os.utime(thumb, (500, 500))
+    gallery_export.make_renditions(src, targets)
+    assert os.path.getmtime(thumb) > 2000
+    assert os.path.getmtime(web) == 2000
+    assert sorted(os.listdir(tmp_path / "thumbs")) == ["1.jpg"]
+
+
+def test_make_renditions_warns_once_for_missing_or_unreadable_source(tmp_path, capsys):
+    targets = [(str(tmp_path / "thumbs" / "1.jpg"), 240), (str(tmp_path / "web" / "1.jpg"), 1600)]
+    assert gallery_export.make_renditions(str(tmp_path / "gone.jpg"), targets) == [None, None]
+    assert capsys.readouterr().out.count("Warning") == 1
+
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not a jpeg")
+    assert gallery_export.make_renditions(str(bad), targets) == [None, None]
+    assert capsys.readouterr().out.count("Warning") == 1
+    assert not os.path.exists(tmp_path / "thumbs")
+
+
+def test_render_contact_sheet_draws_placeholder_for_missing_thumbnails(tmp_path, capsys):
+    thumb = make_photo(tmp_path / "thumb.png", size=(240, 240), color=(0, 0, 255))
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not a jpeg")
+    photos = [photo(1, 1), photo(2, 2), photo(3, 3)]
+    sheet = str(tmp_path / "sheet.png")
+
+    assert gallery_export.render_contact_sheet("Beginner", photos, [thumb, None, str(bad)], sheet, columns=2) == sheet
+    tile_w = gallery_export.THUMB_SIZE + 2 * gallery_export.TILE_PADDING
+    tile_h = gallery_export.THUMB_SIZE + gallery_export.CAPTION_HEIGHT + 2 * gallery_export.TILE_PADDING
+    centre = gallery_export.TILE_PADDING + gallery_export.THUMB_SIZE // 2
+    with Image.open(sheet) as png:
+        assert png.size == (2 * tile_w, gallery_export.HEADER_HEIGHT + 2 * tile_h)
+        top = gallery_export.HEADER_HEIGHT + centre
+        assert png.getpixel((centre, top)) == (0, 0, 255)
+        assert png.getpixel((tile_w + centre, top)) == gallery_export.MISSING_TILE
+        assert png.getpixel((centre, top + tile_h)) == gallery_export.MISSING_TILE
+    assert "Could not draw thumbnail" in capsys.readouterr().out
+    assert sorted(os.listdir(tmp_path)) == ["bad.jpg", "sheet.png", "thumb.png"]
+
+
+def test_write_gallery_html_orders_by_rank_and_escapes_names(tmp_path):
+    photos = [
+        photo(1, 10, name="<b>First</b>"),
+        photo(2, 11, name="Second", photographer="Tom & Jerry"),
+        photo(3, 12, name="Third"),
+    ]
+    results = {"A/B": {
+        "rank": np.array([1, 2, 3]),
+        "number": np.array([2, 1, 3]),
+        "photo_id": np.array([11, 10, 12]),
+        "score": np.array([0.9, 0.4, np.nan]),
+        "ci_low": np.array([np.nan] * 3),
+        "ci_high": np.array([np.nan] * 3),
+        "judges": np.array([2, 2, 0]),
+    }}
+    categories = {"A/B": (photos, ["thumbs/10.jpg", "thumbs/11.jpg", None], ["web/10.jpg", "web/11.jpg", None],
+                          "contact_sheet_A_B.png")}
+    path = tmp_path / "index.html"
+    gallery_export.write_gallery_html(path, categories, results)
+    page = path.read_text(encoding="utf-8")
+
+    assert page.index("#2: Second") < page.index("#1: &lt;b&gt;First&lt;/b&gt;") < page.index("#3: Third")
+    assert "<b>First</b>" not in page
+    assert "Tom &amp; Jerry" in page
+    assert "Rank 1 (0.90)" in page and "Not scored" in page
+    assert page.count("class=\"missing\"") == 1
+
+
+def test_sheet_filenames_do_not_collide():
+    names = gallery_export._sheet_filenames(["A/B", "A_B", "a_b", ""])
+    assert names[""] == "contact_sheet_category.png"
+    assert names["A/B"] == "contact_sheet_A_B.png"
+    assert len({name.lower() for name in names.values()}) == 4
+
+
+def test_prune_renditions_removes_deleted_photos(tmp_path):
+    for kind in ("thumbs", "web"):
+        os.makedirs(tmp_path / kind)
+        for photo_id in (1, 2, 3):
+            (tmp_path / kind / f"{photo_id}.jpg").write_bytes(b"")
+    gallery_export.prune_renditions(str(tmp_path), [1, 3])
+    assert sorted(os.listdir(tmp_path / "thumbs")) == ["1.jpg", "3.jpg"]
+    assert sorted(os.listdir(tmp_path / "web")) == ["1.jpg", "3.jpg"]
@@ -0,0 +1,236 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import results_engine
+
+nan = np.nan
+
+
+def assert_same(actual, expected):
+    np.testing.assert_allclose(actual, np.array(expected, dtype=float), equal_nan=True)
+
+
+def test_rank_normalize_averages_tied_scores():
+    scores = np.array([[7.0], [3.0], [7.0], [5.0], [7.0]])
+    # Sorted: 3, 5, 7, 7, 7 -> the three 7s share ranks 2, 3, 4 -> 3 / 4
+    assert_same(results_engine.rank_normalize(scores), [[0.75], [0.0], [0.75], [0.25], [0.75]])
+
+
+def test_rank_normalize_ignores_missing_scores():
+    scores = np.array([
+        [1.0, nan],
+        [nan, 4.0],
+        [3.0, 2.0],
+        [2.0, nan],
+    ])
+    assert_same(results_engine.rank_normalize(scores), [
+        [0.0, nan],
+        [nan, 1.0],
+        [1.0, 0.0],
+        [0.5, nan],
+    ])
+
+
+def test_rank_normalize_single_score_judge_is_middle():
+    scores = np.array([[nan, 1.0], [8.0, 2.0], [nan, 3.0]])
+    assert_same(results_engine.rank_normalize(scores)[:, 0], [nan, 0.5, nan])
+
+
+def test_rank_normalize_all_nan_row_and_empty_matrix():
+    scores = np.array([[1.0, 2.0], [nan, nan], [3.0, 1.0]])
+    assert_same(results_engine.rank_normalize(scores), [[0.0, 1.0], [nan, nan], [1.0, 0.0]])
+    assert results_engine.rank_normalize(np.empty((0, 3))).shape == (0, 3)
+    assert results_engine.rank_normalize(np.empty((4, 0))).shape == (4, 0)
+
+
+def test_zscore_normalize_constant_judge_becomes_zero():
+    scores = np.array([[5.0, 1.0], [5.0, 3.0], [nan, nan]])
+    assert_same(results_engine.zscore_normalize(scores), [[0.0, -1.0], [0.0, 1.0], [nan, nan]])
+
+
+def test_trimmed_mean_trims_per_photo_judge_count():
+    scores = np.array([
+        [0.0, 4.0, 5.0, 6.0, 100.0],   # n=5, cut 1 each end -> mean(4, 5, 6)
+        [0.0, 4.0, nan, 6.0, nan],     # n=3, cut 0 -> mean(0, 4, 6)
+        [nan, 9.0, nan, nan, nan],     # single judge
+        [nan, nan, nan, nan, nan],     # unscored
+    ])
+    assert_same(results_engine.trimmed_mean(scores, 0.2), [5.0, 10.0 / 3, 9.0, nan])
+
+
+def test_trimmed_mean_with_tied_scores_at_the_cut():
+    scores = np.array([[2.0, 2.0, 2.0, 8.0, 8.0]])
+    assert_same(results_engine.trimmed_mean(scores, 0.2), [4.0])
+
+
+def test_trimmed_mean_empty_matrix():
+    assert results_engine.trimmed_mean(np.empty((0, 3))).shape == (0,)
+    assert_same(results_engine.trimmed_mean(np.empty((2, 0))), [nan, nan])
+
+
+def test_t_quantile_975_matches_tables():
+    assert_same(results_engine.t_quantile_975([0, 1, 2, 7, 30]), [nan, 12.706, 4.303, 2.365, 2.042])
+    # Beyond the table: t(0.975, 40) = 2.021, t(0.975, 120) = 1.980
+    np.testing.assert_allclose(results_engine.t_quantile_975([40, 120]), [2.021, 1.980], atol=1e-3)
+
+
+def test_confidence_interval_surrounds_trimmed_mean():
+    scores = np.array([[1.0, 2.0, 3.0, 4.0, 100.0], [3.0, nan, nan, nan, nan]])
+    low, high = results_engine.confidence_interval(scores, trim=0.2)
+    # Winsorized 2, 2, 3, 4, 4 has s_w = 1; kept h = 3 -> t(2) * sqrt(5) / 3
+    margin = 4.303 * np.sqrt(5) / 3
+    assert_same(low, [3.0 - margin, nan])
+    assert_same(high, [3.0 + margin, nan])
+
+
+def test_confidence_interval_without_trim_is_t_interval_for_the_mean():
+    scores = np.array([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+    low, high = results_engine.confidence_interval(scores, trim=0.0)
+    margin = 2.571 * np.std(scores, ddof=1) / np.sqrt(6)
+    assert_same(low, [3.5 - margin])
+    assert_same(high, [3.5 + margin])
+
+
+def test_confidence_interval_needs_two_scores_after_trimming():
+    scores = np.array([[1.0, 5.0, 9.0]])
+    low, high = results_engine.confidence_interval(scores, trim=0.4)
+    assert_same(low, [nan])
+    assert_same(high, [nan])
+
+
+def test_rank_photos_shares_ranks_for_ties():
+    photo_ids = np.array([10, 11, 12, 13, 14])
+    final = np.array([9.0, 9.0, 7.0, nan, 7.0])
+    order, ranks = results_engine.rank_photos(photo_ids, final)
+    assert photo_ids[order].tolist() == [10, 11, 12, 14, 13]
+    assert ranks.tolist() == [1, 1, 3, 3, 5]
+
+
+def test_rank_photos_empty():
+    order, ranks = results_engine.rank_photos(np.empty(0, dtype=np.int64), np.empty(0))
+    assert order.tolist() == [] and ranks.tolist() == []
+
+
+def test_compute_category_results_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        results_engine.compute_category_results(np.array([1]), np.array([[1.0]]), method="median")
+
+
+def make_db():
+    db = sqlite3.connect(":memory:")
+    db.execute("""
+        CREATE TABLE Photos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filepath TEXT NOT NULL,
+            category TEXT NOT NULL,
+            photo_name TEXT NOT NULL,
+            photographer TEXT NOT NULL
+        )
+    """)
+    results_engine.ensure_scores_table(db)
+    return db
+
+
+def test_load_score_matrices_keeps_latest_named_score_and_averages_unattributed():
+    db = make_db()
+    db.executemany(
+        "INSERT INTO Photos (filepath, category, photo_name, photographer) VALUES (?, ?, ?, ?)",
+        [("a.jpg", "Beginner", "A", "Ann"), ("b.jpg", "Advanced", "B", "Bob"), ("c.jpg", "Beginner", "C", "Cat")],
+    )
+    db.executemany("INSERT INTO scores (photo_id, judge, score) VALUES (?, ?, ?)", [
+        (1, "", 10), (1, "", 2), (1, "", 3),
+        (1, "Jo", 4), (3, "Jo", 6), (1, "Jo", 9),
+        (2, "Sam", 7),
+        (99, "Jo", 1),  # photo since removed
+    ])
+    matrices = results_engine.load_score_matrices(db)
+
+    photo_ids, judges, scores = matrices["Beginner"]
+    assert photo_ids.tolist() == [1, 3]
+    assert judges == ["", "Jo"]
+    assert_same(scores, [[5.0, 9.0], [nan, 6.0]])
+
+    photo_ids, judges, scores = matrices["Advanced"]
+    assert photo_ids.tolist() == [2]
+    assert judges == ["Sam"]
+    assert_same(scores, [[7.0]])
+
+
+def test_compute_results_numbers_photos_like_the_admin_list():
+    db = make_db()
+    db.executemany(
+        "INSERT INTO Photos (filepath, category, photo_name, photographer) VALUES (?, ?, ?, ?)",
+        [("a.jpg", "Beginner", "A", "Ann"), ("b.jpg", "Beginner", "B", "Bob"), ("c.jpg", "Beginner", "C", "Cat")],
+    )
+    db.executemany("INSERT INTO scores (photo_id, judge, score) VALUES (?, ?, ?)", [
+        (1, "Jo", 5), (2, "Jo", 8), (1, "Sam", 2), (2, "Sam", 9),
+    ])
+    results = results_engine.compute_results(db, method="raw")["Beginner"]
+    assert results["rank"].tolist() == [1, 2, 3]
+    assert results["number"].tolist() == [2, 1, 3]
+    assert results["judges"].tolist() == [2, 2, 0]
+    rows = list(results_engine.result_rows(results))
+    assert rows[0] == {
+        "rank": 1, "number": 2, "photo_id": 2, "score": 8.5,
+        "ci_low": rows[0]["ci_low"], "ci_high": rows[0]["ci_high"], "judges": 2,
+    }
+    assert isinstance(rows[0]["photo_id"], int)
+
+
+def test_compute_results_does_not_change_the_schema():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE Photos (id INTEGER PRIMARY KEY, filepath TEXT, category TEXT, photo_name TEXT, photographer TEXT)")
+    db.executemany("INSERT INTO Photos VALUES (?, ?, ?, ?, ?)", [(1, "a.jpg", "Beginner", "A", "Ann"), (2, "b.jpg", "Beginner", "B", "Bob")])
+    schema = db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+
+    results = results_engine.compute_results(db)["Beginner"]
+    assert results["judges"].tolist() == [0, 0]
+    assert db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    # Legacy scores table without a judge column: every row is unattributed
+    db.execute("CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, photo_id INTEGER, score INTEGER)")
+    db.executemany("INSERT INTO scores (photo_id, score) VALUES (?, ?)", [(1, 4), (1, 8), (2, 3)])
+    schema = db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    photo_ids, judges, scores = results_engine.load_score_matrices(db)["Beginner"]
+    assert judges == [""]
+    assert_same(scores, [[6.0], [3.0]])
+    results_engine.compute_results(db)
+    assert db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+
+def test_load_score_matrices_skips_null_rows_in_legacy_table():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE Photos (id INTEGER PRIMARY KEY, filepath TEXT, category TEXT, photo_name TEXT, photographer TEXT)")
+    db.executemany("INSERT INTO Photos VALUES (?, ?, ?, ?, ?)", [(1, "a.jpg", "Beginner", "A", "Ann"), (2, "b.jpg", "Beginner", "B", "Bob")])
+    db.execute("CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, photo_id INTEGER, judge TEXT, score INTEGER)")
+    db.executemany("INSERT INTO scores (photo_id, judge, score) VALUES (?, ?, ?)", [
+        (1, "Jo", None), (None, "Jo", 7), (2, "Jo", 5), (1, "Jo", 4), (2, "Jo", None),
+    ])
+    photo_ids, judges, scores = results_engine.load_score_matrices(db)["Beginner"]
+    assert judges == ["Jo"]
+    assert_same(scores, [[4.0], [5.0]])
+
+
+def test_load_score_matrices_falls_back_for_non_integer_scores():
+    db = make_db()
+    db.executemany(
+        "INSERT INTO Photos (filepath, category, photo_name, photographer) VALUES (?, ?, ?, ?)",
+        [("a.jpg", "Beginner", "A", "Ann"), ("b.jpg", "Beginner", "B", "Bob"), ("c.jpg", "Beginner", "C", "Cat")],
+    )
+    db.executemany("INSERT INTO scores (photo_id, judge, score) VALUES (?, ?, ?)", [
+        (1, "Jo", 7.5), (2, "Jo", 1000), (3, "Jo", -2),
+        (1, "Sam", 3), (2, "Sam", 10), (3, "Sam", 0),
+    ])
+    photo_ids, judges, scores = results_engine.load_score_matrices(db)["Beginner"]
+    assert judges == ["Jo", "Sam"]
+    assert_same(scores, [[7.5, 3.0], [1000.0, 10.0], [-2.0, 0.0]])
+
+
+def test_unpack_fixed_width_rejects_tokens_of_the_wrong_width():
+    assert results_engine._unpack_fixed_width("101,107", 3, 100).tolist() == [1, 7]
+    # A short and a long token cancel out in total length but shift the comma
+    assert results_engine._unpack_fixed_width("95,1000", 3, 100) is None
+    assert results_engine._unpack_fixed_width("107.5,102", 3, 100) is None
+    assert results_engine._unpack_fixed_width("-10,105", 3, 100) is None